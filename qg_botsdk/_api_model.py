@@ -1,12 +1,24 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+from json import dumps
 from typing import Dict, List, Optional
 
 
 class object_class:
-    def __init__(self, _static_copy, _data):
+    def __init__(self, _raw, _data):
         self.__dict__.update(_data)
-        self._static_copy = _static_copy
+        self._raw = _raw
+        self._static_copy_cache = None
+
+    @property
+    def _static_copy(self):
+        # serialized on first use only, as most objects are never printed
+        if self._static_copy_cache is None:
+            try:
+                self._static_copy_cache = dumps(self._raw)
+            except (TypeError, ValueError):
+                self._static_copy_cache = str(self._raw)
+        return self._static_copy_cache
 
     def __doc__(self):
         return self._static_copy
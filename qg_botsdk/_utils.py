@@ -1,17 +1,22 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 from asyncio import iscoroutinefunction
+from contextvars import ContextVar
 from functools import wraps
-from inspect import Signature, signature, stack
-from json import dumps, loads
+from inspect import Signature, signature
 from json.decoder import JSONDecodeError
-from sys import exc_info
+from sys import _getframe, exc_info
 from time import localtime, strftime
 from traceback import extract_tb
 from typing import BinaryIO, Callable, Dict, Iterable, Optional, Union
 
 from aiohttp import ContentTypeError
 
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
+
 from ._api_model import BaseMessageApiModel, object_class, send_msg
 from .version import __version__
 
@@ -21,28 +26,32 @@ security_header = {
     "charset": "UTF-8",
     "User-Agent": f"qg-botsdk v{__version__}",
 }
-retry_err_code = (
-    101,
-    11281,
-    11252,
-    11263,
-    11242,
-    11252,
-    130000,
-    306003,
-    306005,
-    306006,
-    501002,
-    501003,
-    501004,
-    501006,
-    501007,
-    501011,
-    501012,
-    620007,
-    22009,
-    304082,
-    304083,
+# the callback_max_concurrency slot (a Semaphore) held by the current callback, if any
+callback_slot = ContextVar("callback_slot", default=None)
+retry_err_code = frozenset(
+    (
+        101,
+        11281,
+        11252,
+        11263,
+        11242,
+        11252,
+        130000,
+        306003,
+        306005,
+        306006,
+        501002,
+        501003,
+        501004,
+        501006,
+        501007,
+        501011,
+        501012,
+        620007,
+        22009,
+        304082,
+        304083,
+    )
 )
 msg_t = ("MESSAGE_CREATE", "AT_MESSAGE_CREATE", "DIRECT_MESSAGE_CREATE")
 event_t = (
@@ -148,29 +157,27 @@ def objectize(
     data, api=None, is_async=False
 ):  # if api is not None, the event is a resp class
     if isinstance(data, dict):
-        try:
-            _static_copy = dumps(data)
-        except (TypeError, JSONDecodeError):
-            _static_copy = str(data)
-        # main func to process data
+        # attributes are collected in a new dict, leaving data untouched as the raw
+        # source of the object's lazily serialized representation
+        attrs = {}
         for keys, values in data.items():
             if keys.isnumeric():
                 return data
             if isinstance(values, dict):
-                data[keys] = objectize(values)
+                values = objectize(values)
             elif isinstance(values, list):
-                for i, items in enumerate(values):
-                    if isinstance(items, dict):
-                        data[keys][i] = objectize(items)
+                values = [
+                    objectize(items) if isinstance(items, dict) else items
+                    for items in values
+                ]
+            attrs[keys] = values
         if api:
-            data["api"] = api
+            attrs["api"] = api
             object_data = (
-                async_event_class(_static_copy, data)
-                if is_async
-                else event_class(_static_copy, data)
+                async_event_class(data, attrs) if is_async else event_class(data, attrs)
             )
         else:
-            object_data = object_class(_static_copy, data)
+            object_data = object_class(data, attrs)
         return object_data
     else:
         return data
@@ -217,12 +224,12 @@ def security_wrapper(func):
 
 
 def stack_exception_handler(error, stack_no: int = 1):
-    target_frame = stack()[stack_no]
+    target_frame = _getframe(stack_no)
     return '[error:{}] File "{}", line {}, in {}'.format(
         error.__repr__(),
-        target_frame.filename,
-        target_frame.lineno,
-        target_frame.function,
+        target_frame.f_code.co_filename,
+        target_frame.f_lineno,
+        target_frame.f_code.co_name,
     )
 
 
@@ -252,7 +259,9 @@ def exception_processor(func):
 
 
 def treat_msg(raw_msg: str, at: str):
-    raw_msg = raw_msg if raw_msg.find(at) else raw_msg.replace(at, "", 1).strip()
+    raw_msg = raw_msg.strip()
+    if raw_msg.startswith(at):
+        raw_msg = raw_msg[len(at) :].lstrip()
     if not raw_msg:
         return ""
     if raw_msg[0] == "/":
@@ -267,13 +276,16 @@ def treat_msg(raw_msg: str, at: str):
 
 
 def treat_thread(data: Dict):
+    thread_info = data.get("d", {}).get("thread_info")
+    if not thread_info:
+        return
     for items in ("content", "title"):
-        try:
-            data["d"]["thread_info"][items] = loads(
-                data.get("d", {}).get("thread_info", {}).get(items, "{}")
-            )
-        except JSONDecodeError:
-            pass
+        value = thread_info.get(items)
+        if isinstance(value, str):
+            try:
+                thread_info[items] = loads(value)
+            except JSONDecodeError:
+                pass
 
 
 @template_wrapper
@@ -371,13 +383,15 @@ class TraceCallerData:
         self.datas = datas
 
     def get_target_data(self):
-        for frame in stack():
-            caller_name = frame.function
+        # walk frames directly, inspect.stack() reads source context for every frame
+        frame = _getframe(1)
+        while frame is not None:
+            caller_name = frame.f_code.co_name
             if caller_name in self.caller_names:
                 if not self.datas:
-                    return frame.frame.f_locals
+                    return frame.f_locals
                 try:
-                    target_data = frame.frame.f_locals
+                    target_data = frame.f_locals
                     for data in self.datas:
                         target_data = (
                             target_data.get(data, None)
@@ -387,6 +401,7 @@ class TraceCallerData:
                     return target_data
                 except Exception:
                     pass
+            frame = frame.f_back
 
     def __getattr__(self, item):
         target_data = self.get_target_data()
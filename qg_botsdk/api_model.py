@@ -5,7 +5,7 @@ from typing import BinaryIO, Dict, List, Optional, Union
 from ._api_model import BaseMessageApiModel
 from ._api_model import MessageConstructRet as _MessageConstructRet
 from ._utils import sdk_error_temp
-from .http import FormData_
+from .http import FilePathPayload, FormData_
 
 
 class ApiModel:
@@ -76,8 +76,7 @@ class ApiModel:
                     self.__file_image = self.__file_image.read()
                 elif isinstance(self.__file_image, str):
                     if exists(self.__file_image):
-                        with open(self.__file_image, "rb") as img:
-                            self.__file_image = img.read()
+                        self.__file_image = FilePathPayload(self.__file_image)
                     else:
                         if self.__file_image.startswith("http"):
                             return _MessageConstructRet(
@@ -100,7 +99,12 @@ class ApiModel:
                 data_ = FormData_()
                 for keys, values in json_.items():
                     if values is not None and keys != "image":
-                        data_.add_field(keys, values)
+                        # bytes get a filename by default, keep the same for payloads
+                        data_.add_field(
+                            keys,
+                            values,
+                            filename=keys if keys == "file_image" else None,
+                        )
                 return _MessageConstructRet(result=True, kwargs={"data": data_})
             else:
                 return _MessageConstructRet(result=True, kwargs={"json": json_})
@@ -11,6 +11,7 @@ from ._exception import WaitError, WaitTimeoutError
 from ._statics import TraceNames
 from ._utils import (
     TraceCallerData,
+    callback_slot,
     empty_temp,
     http_temp,
     objectize,
@@ -55,19 +56,30 @@ class AsyncAPI:
         command_obj.func = None
         scope_key = self.__session_manager.register_wait_for(data, scope, command_obj)
         _timeout_stamp = time() + timeout if timeout else None
-        while True:
-            check, result = self.__session_manager.check_wait_for(
-                scope_key, command_obj
-            )
-            if not check:
-                self.__session_manager.del_wait_for(data, command_obj)
-                raise WaitError("找不到对应的wait_for()等待任务")
-            if result is not None:
-                break
-            if _timeout_stamp and time() > _timeout_stamp:
-                self.__session_manager.del_wait_for(data, command_obj)
-                raise WaitTimeoutError(f"wait_for()等待超时： {command_obj}")
-            await sleep(0.5)
+        # hand back the callback_max_concurrency slot so that other callbacks can
+        # run while this one is waiting
+        slot = callback_slot.get()
+        if slot is not None:
+            callback_slot.set(None)
+            slot.release()
+        try:
+            while True:
+                check, result = self.__session_manager.check_wait_for(
+                    scope_key, command_obj
+                )
+                if not check:
+                    self.__session_manager.del_wait_for(data, command_obj)
+                    raise WaitError("找不到对应的wait_for()等待任务")
+                if result is not None:
+                    break
+                if _timeout_stamp and time() > _timeout_stamp:
+                    self.__session_manager.del_wait_for(data, command_obj)
+                    raise WaitTimeoutError(f"wait_for()等待超时： {command_obj}")
+                await sleep(0.5)
+        finally:
+            if slot is not None:
+                await slot.acquire()
+                callback_slot.set(slot)
         return result
 
     # bot open api
@@ -1,46 +1,67 @@
-from asyncio import AbstractEventLoop, get_event_loop
+from asyncio import AbstractEventLoop, get_event_loop, sleep
+from os.path import getsize
+from random import random
+from re import findall as re_findall
 from typing import Optional
 
 from aiohttp import (
     ClientSession,
     ClientTimeout,
     FormData,
-    TCPConnector,
     hdrs,
     multipart,
     payload,
 )
+from aiohttp import __version__ as aio_version
 
 from ._api_model import StrPtr
 from ._queue import Queue
 from ._utils import exception_handler, general_header, retry_err_code
 
-try:
-    from importlib.metadata import version
+MaxRetryTimes = 1
+RetryBackoffBase = 0.1
 
-    aio_version = version("aiohttp")
-except (ImportError, ModuleNotFoundError):
-    from pkg_resources import get_distribution
+if __debug__:
+    version_checking = (3, 8, 1)
+    if tuple(int(i) for i in re_findall(r"\d+", aio_version)[:3]) < version_checking:
+        print(
+            f"\033[1;33m[warning] 注意你的aiohttp版本为{aio_version}，SDK建议升级到3.8.1，避免出现无法预计的错误\033[0m"
+        )
 
-    aio_version = get_distribution("aiohttp").version
 
-version_checking = (3, 8, 1)
-for version_index in range(3):
-    try:
-        if int(aio_version[2 * version_index]) < version_checking[version_index]:
-            print(
-                f"\033[1;33m[warning] 注意你的aiohttp版本为{aio_version}，SDK建议升级到3.8.1，避免出现无法预计的错误\033[0m"
-            )
-            break
-    except (ValueError, IndexError):
-        pass
+# streams a local file in chunks on every write, keeping uploads off memory while
+# still allowing the same form to be sent again on retry
+class FilePathPayload(payload.Payload):
+    _chunk_size = 2**16
+
+    def __init__(self, value: str, *args, **kwargs):
+        kwargs.setdefault("content_type", "application/octet-stream")
+        super().__init__(value, *args, **kwargs)
+        self._size = getsize(value)
+        self._autoclose = True
+
+    def decode(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        with open(self._value, "rb") as f:
+            return f.read().decode(encoding, errors)
+
+    async def write(self, writer) -> None:
+        loop = get_event_loop()
+        f = await loop.run_in_executor(None, open, self._value, "rb")
+        try:
+            chunk = await loop.run_in_executor(None, f.read, self._chunk_size)
+            while chunk:
+                await writer.write(chunk)
+                chunk = await loop.run_in_executor(None, f.read, self._chunk_size)
+        finally:
+            await loop.run_in_executor(None, f.close)
 
 
 # derived from aiohttp FormData object, changing the return of _is_processed to allow retry using the same data object
 class FormData_(FormData):
     def _gen_form_data(self) -> multipart.MultipartWriter:
         """Encode a list of fields using the multipart/form-data MIME format"""
-        if self._is_processed:
+        # newer aiohttp no longer defines _is_processed on FormData
+        if getattr(self, "_is_processed", False):
             return self._writer
         for dispparams, headers, value in self._fields:
             try:
@@ -98,23 +119,12 @@ class Session:
         self._is_log_error = is_log_error
         self._logger = logger
         self._queue = Queue(max_concurrency)
-        if not kwargs.get("connector", None):
-            if not loop.is_running():
-                kwargs["connector"] = loop.run_until_complete(self._create_connector())
-            else:
-
-                def __callback(f):
-                    self._kwargs["connector"] = f.result()
-
-                loop.create_task(self._create_connector()).add_done_callback(__callback)
+        # the session (and its connector, unless one is given in kwargs) is created
+        # lazily by _check_session() on the first request, within the running loop
         self._kwargs = kwargs
         self._session: Optional[ClientSession] = None
         self._timeout = ClientTimeout(total=timeout)
         self._loop = loop
-        if not loop.is_running():
-            loop.run_until_complete(self._check_session())
-        else:
-            loop.create_task(self._check_session())
 
     def __del__(self):
         if self._session and not self._session.closed:
@@ -127,10 +137,6 @@ class Session:
             except Exception:
                 pass
 
-    @staticmethod
-    async def _create_connector(*args, **kwargs):
-        return TCPConnector(*args, **kwargs)
-
     async def _check_session(self):
         if not self._session or self._session.closed:
             self._session = ClientSession(timeout=self._timeout, **self._kwargs)
@@ -142,34 +148,47 @@ class Session:
             f'trace_id：{resp.headers.get("X-Tps-Trace-Id", None)}'
         )
 
-    def __getattr__(self, item):
-        if item in ("get", "post", "delete", "patch", "put"):
+    def _dispatch(self, method, *args, **kwargs):
+        try:
+            return self._queue.create_task(self._request, method, *args, **kwargs)
+        except Exception as e:
+            self._logger.error(
+                f"HTTP API(url:{args[0]})调用错误，详情：{exception_handler(e)}"
+            )
 
-            def wrap(*args, **kwargs):
-                try:
-                    return self._queue.create_task(self._request, item, *args, **kwargs)
-                except Exception as e:
-                    self._logger.error(
-                        f"HTTP API(url:{args[0]})调用错误，详情：{exception_handler(e)}"
-                    )
+    def get(self, *args, **kwargs):
+        return self._dispatch("get", *args, **kwargs)
+
+    def post(self, *args, **kwargs):
+        return self._dispatch("post", *args, **kwargs)
+
+    def put(self, *args, **kwargs):
+        return self._dispatch("put", *args, **kwargs)
 
-            return wrap
+    def patch(self, *args, **kwargs):
+        return self._dispatch("patch", *args, **kwargs)
 
-    async def _request(self, method, url, retry=False, **kwargs):
+    def delete(self, *args, **kwargs):
+        return self._dispatch("delete", *args, **kwargs)
+
+    async def _request(self, method, url, **kwargs):
         await self._check_session()
-        resp = await self._session.request(method, url, **kwargs)
-        if resp.ok:
-            return resp
-        if self._is_log_error and (not self._is_retry or retry):
-            await self._warning(url, resp)
-        if self._is_retry and not retry:
+        retry_times = MaxRetryTimes if self._is_retry else 0
+        retry_codes = retry_err_code
+        for attempt in range(retry_times + 1):
+            resp = await self._session.request(method, url, **kwargs)
+            if resp.ok:
+                return resp
+            if attempt == retry_times:
+                break
             if resp.headers.get("content-type", "") == "application/json":
                 json_ = await resp.json()
-                if (
-                    not isinstance(json_, dict)
-                    or json_.get("code", None) not in retry_err_code
-                ):
+                code = json_.get("code") if isinstance(json_, dict) else None
+                if code not in retry_codes:
                     await self._warning(url, resp)
                     return resp
-            return await self._request(method, url, True, **kwargs)
+            # exponential backoff with jitter, avoiding retries in lockstep
+            await sleep(min(RetryBackoffBase * 2**attempt, 2) + random() * 0.05)
+        if self._is_log_error:
+            await self._warning(url, resp)
         return resp
@@ -8,7 +8,6 @@ from os.path import exists
 from os.path import split as path_split
 from re import Pattern
 from threading import Lock as TLock
-from time import sleep as t_sleep
 from typing import Any, Callable, Iterable, List, Optional, Union
 
 from . import _exception
@@ -27,7 +26,6 @@ from .version import __version__
 
 pid = getpid()
 print(f"本次程序进程ID：{pid} | SDK版本：{__version__} | 即将开始运行机器人……")
-t_sleep(0.5)
 
 
 class BOT:
@@ -48,6 +46,7 @@ class BOT:
         api_max_concurrency: int = 0,
         api_timeout: int = 20,
         disable_reconnect_on_not_recv_msg: float = 1000,
+        callback_max_concurrency: int = 0,
     ):
         """
         机器人主体，输入BotAppID和密钥，并绑定函数后即可快速使用
@@ -67,6 +66,7 @@ class BOT:
         :param api_max_concurrency: API允许的最大并发数，超过此并发数将进入队列，如此数值<=0代表不开启任何队列，默认0
         :param api_timeout: API请求的超时设置。默认20
         :param disable_reconnect_on_not_recv_msg: 当机器人长时间未收到消息后进行连接而非重连。默认1000秒
+        :param callback_max_concurrency: 在异步模式下，允许同时运行的最大回调协程数，超过此数值将进入等待，wait_for()等待期间不占用名额，如此数值<=0代表不限制，默认0
         """
         self.logger = Logger(bot_id)
         self.bot_id = bot_id
@@ -118,6 +118,7 @@ class BOT:
         self.dm_treat = False
         self.no_permission_warning = no_permission_warning
         self.max_workers = max_workers
+        self.callback_max_concurrency = callback_max_concurrency
         self.is_async = is_async
         self.__session_manager = SessionManager(self.logger)
         self.api: Union[AsyncAPI, API] = AsyncAPI(
@@ -740,6 +741,7 @@ class BOT:
                     self._preprocessors,
                     self.disable_reconnect_on_not_recv_msg,
                     self.__session_manager,
+                    self.callback_max_concurrency,
                 )
                 self.__task = self._loop.create_task(self._bot_class.starter())
                 if is_blocking and not self._loop.is_running():
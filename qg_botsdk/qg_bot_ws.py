@@ -1,19 +1,24 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from asyncio import AbstractEventLoop
+from asyncio import AbstractEventLoop, Semaphore, Task
 from asyncio import TimeoutError as AsyncTimeoutError
-from asyncio import all_tasks, sleep
+from asyncio import sleep, wrap_future
 from concurrent.futures import ThreadPoolExecutor
 from copy import copy, deepcopy
-from json import dumps, loads
 from ssl import create_default_context
-from typing import Any, Callable, Dict, List, Union
+from typing import Any, Callable, Dict, List, Optional, Set, Union
 
 from aiohttp import ClientSession, WSMsgType, WSServerHandshakeError
 
+try:
+    from orjson import dumps, loads
+except ImportError:
+    from json import dumps, loads
+
 from ._session import SessionManager
 from ._statics import EVENTS
 from ._utils import (
+    callback_slot,
     exception_handler,
     exception_processor,
     object_class,
@@ -28,6 +33,9 @@ from .logger import Logger
 from .model import BotCommandObject, Model
 
 Op9RetryTime = 2
+ReconnectBackoffBase = 3
+ReconnectBackoffMax = 60
+WsClosedTypes = (WSMsgType.CLOSE, WSMsgType.CLOSED, WSMsgType.ERROR)
 
 
 class BotWs:
@@ -54,6 +62,7 @@ class BotWs:
         preprocessors: List[Callable[[Model.MESSAGE], Any]],
         disable_reconnect_on_not_recv_msg: float,
         session_manager: SessionManager,
+        callback_max_concurrency: int,
     ):
         """
         此为SDK内部使用类，注册机器人请使用from qg_botsdk.qg_bot import BOT
@@ -89,6 +98,7 @@ class BotWs:
         self.session_id = 0
         self.is_first_run = False
         self.heartbeat = None
+        self._ws_session: Optional[ClientSession] = None
         self.is_async = is_async
         self.events = {
             **dict(zip(EVENTS.GUILD, ["on_guild_event"] * len(EVENTS.GUILD))),
@@ -118,7 +128,17 @@ class BotWs:
             **dict(zip(EVENTS.GROUP, ["on_group_event"] * len(EVENTS.GROUP))),
             **dict(zip(EVENTS.FRIEND, ["on_friend_event"] * len(EVENTS.FRIEND))),
         }
+        self._event_processors = {
+            **dict.fromkeys(EVENTS.MESSAGE_CREATE, self._process_message),
+            **dict.fromkeys(EVENTS.MESSAGE_DELETE, self._process_delete),
+            **dict.fromkeys(EVENTS.DM_CREATE, self._process_dm),
+            **dict.fromkeys(EVENTS.FORUM, self._process_forum),
+        }
         self.threads = ThreadPoolExecutor(max_workers) if not self.is_async else None
+        self.callback_max_concurrency = callback_max_concurrency
+        # created on first use so that it binds to the running loop
+        self._dispatch_sem: Optional[Semaphore] = None
+        self._inflight_tasks: Set[Task] = set()
         self.api = api
         self.commands = commands
         self.preprocessors = preprocessors
@@ -127,6 +147,19 @@ class BotWs:
         self.disable_reconnect = False
         self.disable_reconnect_on_not_recv_msg = disable_reconnect_on_not_recv_msg
         self.skip_connect_waiting = False
+        self._connect_payload = {
+            "op": 2,
+            "d": {
+                "token": self.auth,
+                "intents": self.intents,
+                "shard": [self.shard_no, self.total_shard],
+            },
+        }
+        self._reconnect_payload = {
+            "op": 6,
+            "d": {"token": self.auth, "session_id": None, "seq": None},
+        }
+        self._heart_payload = {"op": 1, "d": None}
 
     @exception_processor
     async def _time_event_run(self):
@@ -156,54 +189,65 @@ class BotWs:
             self.loop.create_task(self._time_event_check())
 
     async def send_connect(self):
-        connect_paras = {
-            "op": 2,
-            "d": {
-                "token": self.auth,
-                "intents": self.intents,
-                "shard": [self.shard_no, self.total_shard],
-            },
-        }
-        await self.ws_send(dumps(connect_paras))
+        await self.ws_send(dumps(self._connect_payload))
 
     async def send_reconnect(self):
-        reconnect_paras = {
-            "op": 6,
-            "d": {"token": self.auth, "session_id": self.session_id, "seq": self.s},
-        }
-        await self.ws_send(dumps(reconnect_paras))
+        reconnect_data = self._reconnect_payload["d"]
+        reconnect_data["session_id"] = self.session_id
+        reconnect_data["seq"] = self.s
+        await self.ws_send(dumps(self._reconnect_payload))
 
-    async def ws_send(self, msg):
+    async def ws_send(self, msg: Union[str, bytes]):
         if not self.ws.closed:
+            # orjson dumps to bytes, while the gateway expects text frames
+            if isinstance(msg, bytes):
+                msg = msg.decode()
             await self.ws.send_str(msg)
 
     async def heart(self):
-        heart_json = {"op": 1, "d": None}
+        heart_payload = self._heart_payload
         while self.running:
             await sleep(self.heartbeat_time)
             if not self.ws.closed:
-                heart_json["d"] = self.s
-                await self.ws.send_str(dumps(heart_json))
+                heart_payload["d"] = self.s
+                await self.ws_send(dumps(heart_payload))
 
     def start_heartbeat(self):
-        if self.heartbeat is None or self.heartbeat not in all_tasks():
+        # restart the heartbeat if it has never run or has finished
+        if self.heartbeat is None or self.heartbeat.done():
             self.heartbeat = self.loop.create_task(self.heart())
 
-    async def get_robot_info(self, retry=False):
-        robot_info = await self.http_session.get(r"https://api.sgroup.qq.com/users/@me")
-        robot_info = await robot_info.json()
-        if "id" not in robot_info:
-            if not retry:
-                return self.get_robot_info(retry)
-            else:
-                self.logger.error("当前获取机器人信息失败，机器人启动失败，程序将退出运行（可重试）")
-                exit()
-        return objectize(robot_info)
+    async def get_robot_info(self):
+        for _ in range(2):
+            robot_info = await self.http_session.get(
+                r"https://api.sgroup.qq.com/users/@me"
+            )
+            robot_info = await robot_info.json()
+            if "id" in robot_info:
+                return objectize(robot_info)
+        self.logger.error("当前获取机器人信息失败，机器人启动失败，程序将退出运行（可重试）")
+        exit()
 
     @exception_processor
     async def async_start_callback_task(self, func, *args):
         return await func(*args)
 
+    async def async_limited_callback_task(self, func, *args):
+        if not self.callback_max_concurrency or self.callback_max_concurrency <= 0:
+            return await self.async_start_callback_task(func, *args)
+        if self._dispatch_sem is None:
+            self._dispatch_sem = Semaphore(self.callback_max_concurrency)
+        sem = self._dispatch_sem
+        await sem.acquire()
+        token = callback_slot.set(sem)
+        try:
+            return await self.async_start_callback_task(func, *args)
+        finally:
+            # AsyncAPI.wait_for() hands the slot back while it waits
+            if callback_slot.get() is sem:
+                sem.release()
+            callback_slot.reset(token)
+
     @exception_processor
     def start_callback_task(self, func, *args):
         return func(*args)
@@ -220,9 +264,13 @@ class BotWs:
                     self.start_callback_task, function, objectized_data
                 )
             else:
-                return self.loop.create_task(
-                    self.async_start_callback_task(function, objectized_data)
+                task = self.loop.create_task(
+                    self.async_limited_callback_task(function, objectized_data)
                 )
+                # keep a strong reference until the callback finishes
+                self._inflight_tasks.add(task)
+                task.add_done_callback(self._inflight_tasks.discard)
+                return task
 
     @exception_processor
     def treat_command(
@@ -286,10 +334,8 @@ class BotWs:
         if not command_obj.is_custom_short_circuit:
             return command_obj.short_circuit  # True or False
         else:
-            while not task.done():
-                await sleep(0.1)
-            r = task.result()
-            return r  # True or False
+            # thread pool futures are wrapped, asyncio tasks are awaited as is
+            return await wrap_future(task)  # True or False
 
     def process_wait_for_commands(self, objectized_data, msg, treated_msg):
         wait_for_commands = self.session_manager.wait_for_message_checker(
@@ -325,33 +371,63 @@ class BotWs:
 
     @exception_processor
     async def distribute_commands(self, data: Dict, treated_msg: str):
-        objectized_data = objectize(data.get("d", {}), self.api, self.is_async)
+        d = data.get("d", {})
+        msg = d.get("content", "")
+        objectized_data = objectize(d, self.api, self.is_async)
         # run preprocessors
         for func in self.preprocessors:
             await self.distribute(func, objectized_data=objectized_data)
         # check commands
-        msg = data.get("d", {}).get("content", "")
         if self.process_wait_for_commands(objectized_data, msg, treated_msg):
             return True
+        at_in_msg = self.at in msg
+        check_command = self.check_command
         for items in self.commands:
             commands = items.command
             regexs = items.regex
             if commands:
                 for command in commands:
-                    if command in msg and (not items.at or self.at in msg):
-                        if await self.check_command(
+                    if command in msg and (not items.at or at_in_msg):
+                        if await check_command(
                             objectized_data, treated_msg, items, command=command
                         ):
                             return True
             else:
                 for regex in regexs:
                     regex = regex.search(msg)
-                    if regex and (not items.at or self.at in msg):
-                        if await self.check_command(
+                    if regex and (not items.at or at_in_msg):
+                        if await check_command(
                             objectized_data, treated_msg, items, regex=regex
                         ):
                             return True
 
+    async def _process_message(self, data: Dict, d: Dict):
+        if self.msg_treat:
+            treated_msg = treat_msg(d.get("content", ""), self.at)
+            d["treated_msg"] = treated_msg
+        else:
+            treated_msg = ""
+        # distribute_commands return True when short circuit
+        if not await self.distribute_commands(data, treated_msg):
+            await self.distribute(self.func_registers["on_msg"], data)
+
+    async def _process_delete(self, data: Dict, d: Dict):
+        if self.func_registers["del_is_filter_self"]:
+            target = d.get("message", {}).get("author", {}).get("id")
+            op_user = d.get("op_user", {}).get("id")
+            if op_user == target:
+                return
+        await self.distribute(self.func_registers["on_delete"], data)
+
+    async def _process_dm(self, data: Dict, d: Dict):
+        if self.dm_treat:
+            d["treated_msg"] = treat_msg(d.get("content", ""), self.at)
+        await self.distribute(self.func_registers["on_dm"], data)
+
+    async def _process_forum(self, data: Dict, d: Dict):
+        treat_thread(data)
+        await self.distribute(self.func_registers["on_forum"], data)
+
     @exception_processor
     async def data_process(self, data: Dict):
         # initialize values
@@ -359,45 +435,25 @@ class BotWs:
         d = data.get("d", {})
         if not d:
             data["d"] = d
-        data["d"]["t"] = t
-        data["d"]["event_id"] = data.get("id")
+        d["t"] = t
+        d["event_id"] = data.get("id")
         # process and distribute data
-        if t in self.events:
-            _key = self.events[t]
+        _key = self.events.get(t)
+        if _key is not None:
             await self.distribute(self.func_registers[_key], data)
-        elif t in EVENTS.MESSAGE_CREATE:
-            if self.msg_treat:
-                raw_msg = d.get("content", "").strip()
-                treated_msg = treat_msg(raw_msg, self.at)
-                data["d"]["treated_msg"] = treated_msg
-            else:
-                treated_msg = ""
-            # distribute_commands return True when short circuit
-            if not await self.distribute_commands(data, treated_msg):
-                await self.distribute(self.func_registers["on_msg"], data)
-        elif t in EVENTS.MESSAGE_DELETE:
-            if self.func_registers["del_is_filter_self"]:
-                target = d.get("message", {}).get("author", {}).get("id")
-                op_user = d.get("op_user", {}).get("id")
-                if op_user == target:
-                    return
-            await self.distribute(self.func_registers["on_delete"], data)
-        elif t in EVENTS.DM_CREATE:
-            if self.dm_treat:
-                raw_msg = d.get("content", "").strip()
-                data["d"]["treated_msg"] = treat_msg(raw_msg, self.at)
-            await self.distribute(self.func_registers["on_dm"], data)
-        elif t in EVENTS.FORUM:
-            treat_thread(data)
-            await self.distribute(self.func_registers["on_forum"], data)
+            return
+        processor = self._event_processors.get(t)
+        if processor is not None:
+            await processor(data, d)
         else:
             self.logger.warning(f"unknown event type: [{t}]")
 
-    async def dispatch_events(self, msg: str):
+    async def dispatch_events(self, msg: Union[str, bytes]):
         data = loads(msg)
         op = data.get("op")
-        if "s" in data:
-            self.s = data["s"]
+        s = data.get("s")
+        if s is not None:
+            self.s = s
         if op == 11:
             self.logger.debug("心跳发送成功")
         elif op == 9:
@@ -431,51 +487,53 @@ class BotWs:
         if self.heartbeat is not None and not self.heartbeat.cancelled():
             self.heartbeat.cancel()
         await self.ws.close()
+        if self._ws_session is not None and not self._ws_session.closed:
+            await self._ws_session.close()
         self.logger.info("WS链接已结束")
 
     async def connect(self):
         self.reconnect_times += 1
         try:
-            async with ClientSession() as ws_session:
-                async with ws_session.ws_connect(self.ws_url, ssl=self._ssl) as self.ws:
-                    while not self.ws.closed:
-                        try:
-                            message = await self.ws.receive(
-                                timeout=self.disable_reconnect_on_not_recv_msg
-                            )
-                        except AsyncTimeoutError:
-                            self.logger.warning("BOT_WS链接已断开，正在尝试重连……")
-                            if (
-                                self.heartbeat is not None
-                                and not self.heartbeat.cancelled()
-                            ):
-                                self.heartbeat.cancel()
-                            self.disable_reconnect = True
-                            self.skip_connect_waiting = True
-                            return
-                        if not self.running:
-                            if not not self.ws.closed:
-                                await self.close()
-                            return
-                        if message.type == WSMsgType.TEXT:
-                            self.loop.create_task(self.dispatch_events(message.data))
-                            if self.disable_reconnect:
-                                await self.ws.close()
-                                return
-                        elif message.type in (
-                            WSMsgType.CLOSE,
-                            WSMsgType.CLOSED,
-                            WSMsgType.ERROR,
+            if self._ws_session is None or self._ws_session.closed:
+                self._ws_session = ClientSession()
+            async with self._ws_session.ws_connect(
+                self.ws_url, ssl=self._ssl
+            ) as self.ws:
+                ws = self.ws
+                receive_timeout = self.disable_reconnect_on_not_recv_msg
+                text_type = WSMsgType.TEXT
+                create_task = self.loop.create_task
+                dispatch_events = self.dispatch_events
+                while not ws.closed:
+                    try:
+                        message = await ws.receive(timeout=receive_timeout)
+                    except AsyncTimeoutError:
+                        self.logger.warning("BOT_WS链接已断开，正在尝试重连……")
+                        if (
+                            self.heartbeat is not None
+                            and not self.heartbeat.cancelled()
                         ):
-                            if self.running:
-                                self.is_reconnect = True
-                                if (
-                                    self.heartbeat is not None
-                                    and not self.heartbeat.cancelled()
-                                ):
-                                    self.heartbeat.cancel()
-                                self.logger.warning("BOT_WS链接已断开，正在尝试重连……")
-                                return
+                            self.heartbeat.cancel()
+                        self.disable_reconnect = True
+                        self.skip_connect_waiting = True
+                        return
+                    if not self.running:
+                        if not not ws.closed:
+                            await self.close()
+                        return
+                    msg_type = message.type
+                    if msg_type is text_type:
+                        create_task(dispatch_events(message.data))
+                        if self.disable_reconnect:
+                            await ws.close()
+                            return
+                    elif msg_type in WsClosedTypes:
+                        break
+                if self.running:
+                    self.is_reconnect = True
+                    if self.heartbeat is not None and not self.heartbeat.cancelled():
+                        self.heartbeat.cancel()
+                    self.logger.warning("BOT_WS链接已断开，正在尝试重连……")
         except Exception as e:
             self.logger.warning("BOT_WS链接已断开，正在尝试重连……")
             if self.heartbeat is not None and not self.heartbeat.cancelled():
@@ -498,5 +556,11 @@ class BotWs:
                 await self.connect()
             except WSServerHandshakeError:
                 self.logger.warning("网络连线不稳定或已断开，请检查网络链接")
-            await sleep(3)
+            # reconnect_times is reset on READY/RESUMED, so only failures back off
+            await sleep(
+                min(
+                    ReconnectBackoffBase * 2 ** min(self.reconnect_times, 5),
+                    ReconnectBackoffMax,
+                )
+            )
             self.is_reconnect = self.reconnect_times < 20
@@ -26,6 +26,53 @@ async def _queue_task(start_time: List):
     await asyncio.sleep(0.5)
 
 
+async def _queue_error_task():
+    raise ValueError("testing error")
+
+
+class _BytesWriter:
+    def __init__(self):
+        self.buffer = bytearray()
+
+    async def write(self, chunk):
+        self.buffer.extend(chunk)
+
+
+async def _serialize_form(form):
+    writer = form()
+    bytes_writer = _BytesWriter()
+    await writer.write(bytes_writer)
+    # boundaries are random per form, normalize them before comparing
+    return bytes(bytes_writer.buffer).replace(writer.boundary.encode(), b"boundary")
+
+
+def _limited_bot_ws(bot: qg_botsdk.BOT, callback_max_concurrency: int):
+    return qg_botsdk.qg_bot_ws.BotWs(
+        bot.loop,
+        bot._http_session,
+        bot.logger,
+        1,
+        0,
+        "",
+        bot.auth,
+        {},
+        0,
+        True,
+        False,
+        None,
+        10,
+        None,
+        True,
+        bot.max_workers,
+        bot.api,
+        [],
+        [],
+        1000,
+        bot._BOT__session_manager,
+        callback_max_concurrency,
+    )
+
+
 @pytest.mark.run_order(1)
 class TestBase:
     @staticmethod
@@ -43,6 +90,7 @@ class TestBase:
         assert bot._shard_no == 0
         assert bot._total_shard == 1
         assert bot.max_workers == 32
+        assert bot.callback_max_concurrency == 0
         assert bot._http_session._queue._MAX_RUNNING_SLOTS == 0
         assert bot._http_session._timeout.total == 20
         assert bot._intents == 0
@@ -100,6 +148,12 @@ class TestBase:
             bot_id=config["bot_id"], bot_token=config["bot_token"], max_workers=64
         )
         assert bot.max_workers == 64
+        bot = qg_botsdk.BOT(
+            bot_id=config["bot_id"],
+            bot_token=config["bot_token"],
+            callback_max_concurrency=5,
+        )
+        assert bot.callback_max_concurrency == 5
         bot = qg_botsdk.BOT(
             bot_id=config["bot_id"],
             bot_token=config["bot_token"],
@@ -446,6 +500,82 @@ class TestBase:
         loop.run_until_complete(queue.create_task(_queue_task, start_time_arr))
         assert start_time_arr[1] - start_time_arr[0] >= 0.5
 
+    @staticmethod
+    @pytest.mark.timeout(5)
+    def test_queue_release_on_error():
+        queue = qg_botsdk._queue.Queue(1)
+        loop = asyncio.get_event_loop()
+        with pytest.raises(ValueError):
+            loop.run_until_complete(queue.create_task(_queue_error_task))
+        start_time_arr = []
+        loop.run_until_complete(queue.create_task(_queue_task, start_time_arr))
+        assert len(start_time_arr) == 1
+
+    @staticmethod
+    @pytest.mark.timeout(10)
+    def test_callback_slot_released_on_wait_for(bot_async):
+        bot_ws = _limited_bot_ws(bot_async, 1)
+        data = {
+            "d": {
+                "t": "AT_MESSAGE_CREATE",
+                "id": "id",
+                "author": {"id": "author_id"},
+                "guild_id": "guild_id",
+                "channel_id": "channel_id",
+                "content": "",
+            }
+        }
+        called = []
+
+        async def _waiting_callback(_):
+            with pytest.raises(qg_botsdk._exception.WaitTimeoutError):
+                await bot_async.api.wait_for(
+                    qg_botsdk.Scope.USER,
+                    qg_botsdk.BotCommandObject(["wait_for_slot_test"]),
+                    timeout=1,
+                )
+            called.append("waiting")
+
+        async def _queued_callback(_):
+            called.append("queued")
+
+        async def _run():
+            waiting = await bot_ws.distribute(_waiting_callback, data)
+            queued = await bot_ws.distribute(_queued_callback, data)
+            # the only slot is held by a callback blocked in wait_for()
+            await asyncio.wait_for(queued, 0.8)
+            assert called == ["queued"]
+            await waiting
+            assert called == ["queued", "waiting"]
+            assert not bot_ws._dispatch_sem.locked()
+
+        bot_async.loop.run_until_complete(_run())
+
+    @staticmethod
+    @pytest.mark.timeout(5)
+    def test_file_path_payload(tmp_path):
+        content = os.urandom(3 * qg_botsdk.http.FilePathPayload._chunk_size + 1)
+        file_path = tmp_path / "file_image.png"
+        file_path.write_bytes(content)
+
+        path_form = qg_botsdk.http.FormData_()
+        path_form.add_field(
+            "file_image",
+            qg_botsdk.http.FilePathPayload(str(file_path)),
+            filename="file_image",
+        )
+        bytes_form = qg_botsdk.http.FormData_()
+        bytes_form.add_field("file_image", content, filename="file_image")
+        assert path_form().size == bytes_form().size
+
+        loop = asyncio.get_event_loop()
+        bytes_body = loop.run_until_complete(_serialize_form(bytes_form))
+        assert b'filename="file_image"' in bytes_body
+        assert content in bytes_body
+        # the same form is sent again when a request is retried
+        for _ in range(2):
+            assert loop.run_until_complete(_serialize_form(path_form)) == bytes_body
+
     @staticmethod
     @pytest.mark.timeout(5)
     def test_func_checking(bot):
@@ -468,3 +598,13 @@ class TestBase:
             qg_botsdk.utils.convert_color((255, 254, 256))
         with pytest.raises(TypeError):
             qg_botsdk.utils.convert_color(255)
+
+    @staticmethod
+    @pytest.mark.timeout(5)
+    def test_treat_thread_util():
+        data = {"d": {"thread_info": {"content": '{"a": 1}', "title": "title"}}}
+        qg_botsdk._utils.treat_thread(data)
+        assert data["d"]["thread_info"] == {"content": {"a": 1}, "title": "title"}
+        data = {"d": {"post_info": {"content": "content"}}}
+        qg_botsdk._utils.treat_thread(data)
+        assert "thread_info" not in data["d"]
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 import asyncio
 import sys
+from json import loads
 from unittest import mock
 
 import pytest
@@ -122,14 +123,14 @@ class TestRunning:
             self.bot.loop.run_until_complete(asyncio.sleep(1))
             mock_ws_send.assert_called_once()
             if sys.version_info >= (3, 8):
-                assert '"op": 2' in mock_ws_send.call_args.args[0]
+                assert loads(mock_ws_send.call_args.args[0])["op"] == 2
             self.bot._bot_class.disable_reconnect = False
             self.bot._bot_class.is_reconnect = True
             self.bot.loop.create_task(self.bot._bot_class.dispatch_events(MockOp10Msg))
             self.bot.loop.run_until_complete(asyncio.sleep(1))
             assert mock_ws_send.call_count == 2
             if sys.version_info >= (3, 8):
-                assert '"op": 6' in mock_ws_send.call_args.args[0]
+                assert loads(mock_ws_send.call_args.args[0])["op"] == 6
 
     @pytest.mark.asyncio
     @pytest.mark.timeout(20)